@@ -0,0 +1,70 @@
+# benchmark_scaling.py
+#
+# Throughput of 1..N concurrent trackers sharing the machine.
+# The same batch of tracking jobs is run through a process pool of each size,
+# with every worker configured by execution_config.pool_initializer, and the
+# frames/second, speedup and per-worker efficiency are reported. With the
+# thread pools sized per worker the speedup should stay close to the worker
+# count (up to the number of physical cores).
+#
+# Usage:
+#   python benchmark_scaling.py --video tennis.mp4 --workers 1 2 4
+#   python benchmark_scaling.py --workers 1 2 4 --pin-cores   (uses a synthetic clip)
+
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+
+from execution_config import available_cores, pool_initargs, pool_initializer
+from track_ball import track_video
+
+
+def run_job(video_path):
+    return len(track_video(video_path)["frame"])
+
+
+def measure(video_path, workers, jobs, pin_cores=False):
+    """Run `jobs` tracking jobs on a pool of `workers` processes. Returns (frames, seconds)"""
+    with multiprocessing.Pool(workers, initializer=pool_initializer, initargs=pool_initargs(workers, pin_cores)) as pool:
+        # Let every worker start up before timing
+        pool.map(time.sleep, [0] * workers)
+        start = time.perf_counter()
+        frames = sum(pool.map(run_job, [video_path] * jobs, chunksize=1))
+        elapsed = time.perf_counter() - start
+    return frames, elapsed
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-v", "--video", help="video to track (default: a generated synthetic clip)")
+    ap.add_argument("-w", "--workers", type=int, nargs="+", default=[1, 2, 4], help="pool sizes to measure")
+    ap.add_argument("-j", "--jobs", type=int, help="tracking jobs per measurement (default: 2x the largest pool)")
+    ap.add_argument("--pin-cores", action="store_true", help="pin each worker to its share of the cores")
+    args = vars(ap.parse_args())
+
+    video_path = args["video"]
+    if video_path is None:
+        from evaluate_tracker import make_synthetic_clip
+
+        directory = tempfile.mkdtemp(prefix="tennis_bench_")
+        video_path = os.path.join(directory, "synthetic.mp4")
+        make_synthetic_clip(video_path, os.path.join(directory, "synthetic_truth.csv"), frames=150)
+
+    jobs = args["jobs"] or 2 * max(args["workers"])
+    print(f"{len(available_cores())} core(s) available, {jobs} job(s) per measurement")
+    print(f"{'workers':>7} {'fps':>9} {'speedup':>8} {'efficiency':>10}")
+
+    baseline = None
+    for workers in args["workers"]:
+        frames, elapsed = measure(video_path, workers, jobs, args["pin_cores"])
+        fps = frames / elapsed
+        if baseline is None:
+            baseline = fps / workers
+        speedup = fps / baseline
+        print(f"{workers:7d} {fps:9.1f} {speedup:8.2f} {speedup / workers:10.0%}")
+
+
+if __name__ == "__main__":
+    main()
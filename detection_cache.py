@@ -0,0 +1,64 @@
+# detection_cache.py
+#
+# On-disk cache of the detector's per-frame candidate lists.
+# Decoding, resizing, HSV thresholding and the morphology passes are by far
+# the most expensive part of the pipeline, but their output - the contour
+# candidates with their features - only depends on the video and the upstream
+# detector parameters. Caching it lets changes to downstream parameters
+# (radius threshold, candidate selection, Kalman settings) replay from the
+# candidate lists instead of decoding the video again.
+
+import hashlib
+import json
+import os
+
+import numpy as np
+
+# Columns of each candidate row
+CANDIDATE_FIELDS = ("x", "y", "radius", "area")
+
+
+class CandidateCache:
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, video_path, params):
+        """Hash of the video identity and the upstream parameters that shaped the candidates"""
+        stat = os.stat(video_path)
+        payload = json.dumps({
+            "video": os.path.abspath(video_path),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "params": params,
+        }, sort_keys=True)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+    def path(self, video_path, params):
+        name = os.path.splitext(os.path.basename(video_path))[0]
+        return os.path.join(self.cache_dir, f"{name}-{self.key(video_path, params)}.npz")
+
+    def load(self, video_path, params):
+        """Return the per-frame list of (N, 4) candidate arrays, or None on a cache miss"""
+        path = self.path(video_path, params)
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            counts, candidates = data["counts"], data["candidates"]
+        if len(counts) == 0:
+            return []
+        return np.split(candidates, np.cumsum(counts)[:-1])
+
+    def save(self, video_path, params, per_frame):
+        """Store the candidate arrays for every frame of the video"""
+        counts = np.array([len(c) for c in per_frame], np.int64)
+        candidates = (
+            np.concatenate(per_frame).astype(np.float32)
+            if per_frame else np.zeros((0, len(CANDIDATE_FIELDS)), np.float32)
+        )
+        path = self.path(video_path, params)
+        # Write to a temp file first so an interrupted run never leaves a partial cache
+        tmp_path = path + ".tmp.npz"
+        np.savez_compressed(tmp_path, counts=counts, candidates=candidates)
+        os.replace(tmp_path, path)
+        return path
@@ -0,0 +1,359 @@
+# evaluate_tracker.py
+#
+# Detection quality vs throughput for different pipeline configurations.
+# Each configuration (processing resolution, ROI search, frame stride, motion
+# gating) is run over clips with known ball positions and scored on
+# precision/recall, position error and track continuity next to its FPS,
+# so speed optimizations can be picked from a measured trade-off curve.
+#
+# Ground truth is a CSV per video with a "frame,x,y" header in source video
+# pixels. Frames with empty x/y, or missing from the file, mean the ball is
+# not visible. Synthetic clips with exact truth can be generated with --synthetic.
+#
+# Usage:
+#   python evaluate_tracker.py --synthetic 3
+#   python evaluate_tracker.py --video match1.mp4 --truth match1_truth.csv --report report.csv
+
+import argparse
+import csv
+import itertools
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from track_ball import DETECTOR_PARAMS, MIN_RADIUS, PROCESS_NOISE, BallTracker, detect_candidates
+
+# Frames the tracker keeps reporting its prediction after losing the ball
+MAX_COAST = 10
+# Motion gating: fraction of changed pixels below which a frame counts as static
+MOTION_FRACTION = 0.002
+
+
+# --- GROUND TRUTH ---
+
+def load_truth(path):
+    """Return {frame: (x, y)} for the frames where the ball is visible"""
+    truth = {}
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            if row["x"] != "" and row["y"] != "":
+                truth[int(row["frame"])] = (float(row["x"]), float(row["y"]))
+    return truth
+
+
+def make_synthetic_clip(video_path, truth_path, frames=300, size=(1280, 720), fps=30, seed=0):
+    """Render a ball rallying over a hard court and write the clip and its truth file"""
+    rng = np.random.default_rng(seed)
+    width, height = size
+
+    # Blue hard court with white lines (outside the tennis ball HSV range)
+    court = np.zeros((height, width, 3), np.uint8)
+    court[:] = (140, 90, 40)
+    cv2.rectangle(court, (width // 8, height // 10), (width * 7 // 8, height * 9 // 10), (255, 255, 255), 3)
+    cv2.line(court, (width // 8, height // 2), (width * 7 // 8, height // 2), (255, 255, 255), 3)
+
+    # Ball moves baseline to baseline, drifting sideways, with random rally speeds
+    period = rng.integers(40, 70)
+    phase = rng.uniform(0, 2 * np.pi)
+    # Short stretches where the ball is hidden (player in front of it, out of frame...)
+    hidden = set()
+    for start in rng.integers(0, frames, size=3):
+        hidden.update(range(start, start + rng.integers(3, 12)))
+
+    writer = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+    with open(truth_path, "w", newline="") as f:
+        truth = csv.writer(f)
+        truth.writerow(["frame", "x", "y"])
+        for i in range(frames):
+            frame = court.copy()
+            t = (i % period) / period
+            y = height * (0.15 + 0.7 * abs(2 * t - 1))
+            x = width * (0.5 + 0.3 * np.sin(2 * np.pi * i / (period * 3) + phase))
+            # Bigger when closer to the camera (bottom of the frame)
+            radius = int(height * (0.035 + 0.02 * y / height))
+
+            if i in hidden:
+                truth.writerow([i, "", ""])
+            else:
+                cv2.circle(frame, (int(x), int(y)), radius, (40, 230, 200), -1)
+                truth.writerow([i, f"{x:.2f}", f"{y:.2f}"])
+
+            noise = rng.normal(0, 6, frame.shape)
+            frame = np.clip(frame + noise, 0, 255).astype(np.uint8)
+            writer.write(frame)
+    writer.release()
+
+
+# --- PIPELINE CONFIGURATIONS ---
+
+def config_name(config):
+    width, height = config["resolution"]
+    return (f"{width}x{height} stride={config['stride']} "
+            f"roi={'on' if config['roi'] else 'off'} gating={'on' if config['motion_gating'] else 'off'}")
+
+
+def scaled_params(width, height):
+    """Detector parameters for another processing resolution (blur kernel scaled with it)"""
+    scale = width / DETECTOR_PARAMS["width"]
+    blur = max(3, int(DETECTOR_PARAMS["blur"] * scale) | 1)
+    return dict(DETECTOR_PARAMS, width=width, height=height, blur=blur), MIN_RADIUS * scale
+
+
+def run_configuration(video_path, config):
+    """Track a video with one configuration.
+
+    Returns ({frame: (x, y)} of reported positions in source pixels, frames, seconds).
+    A frame reports the detection when there is one, otherwise the Kalman
+    prediction for up to MAX_COAST frames after the last detection.
+    """
+    width, height = config["resolution"]
+    params, min_radius = scaled_params(width, height)
+    tracker = BallTracker(min_radius, PROCESS_NOISE)
+
+    camera = cv2.VideoCapture(video_path)
+    if not camera.isOpened():
+        raise IOError(f"Could not open video file: {video_path}")
+    scale_x = camera.get(cv2.CAP_PROP_FRAME_WIDTH) / width
+    scale_y = camera.get(cv2.CAP_PROP_FRAME_HEIGHT) / height
+
+    reported = {}
+    last_detection = None
+    since_detection = MAX_COAST + 1
+    previous_gray = None
+    frame_index = 0
+
+    start = time.perf_counter()
+    while True:
+        (grabbed, frame) = camera.read()
+        if not grabbed:
+            break
+
+        pred_x, pred_y = tracker.predict()
+        tracking = since_detection <= MAX_COAST
+
+        run_detector = frame_index % config["stride"] == 0
+        if run_detector and config["motion_gating"]:
+            # Skip the detector when nothing moved since the last frame
+            small = cv2.resize(frame, (width // 4, height // 4))
+            gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+            if previous_gray is not None:
+                moving = cv2.absdiff(gray, previous_gray) > 25
+                run_detector = np.count_nonzero(moving) > MOTION_FRACTION * moving.size
+            previous_gray = gray
+
+        candidates = None
+        if run_detector:
+            roi = None
+            if config["roi"] and tracking:
+                # Search only around the prediction while the ball is being tracked
+                half = int(max(4 * last_detection[2], 0.1 * width))
+                roi = (max(0, int(pred_x) - half), max(0, int(pred_y) - half),
+                       min(width, int(pred_x) + half), min(height, int(pred_y) + half))
+                if roi[0] >= roi[2] or roi[1] >= roi[3]:
+                    roi = None
+            _, candidates = detect_candidates(frame, params, roi)
+
+        # Frames skipped by the stride or motion gate only get the prediction
+        detection = tracker.correct(candidates)
+        if detection is not None:
+            last_detection = detection
+            since_detection = 0
+            reported[frame_index] = (detection[0] * scale_x, detection[1] * scale_y)
+        else:
+            since_detection += 1
+            if since_detection <= MAX_COAST:
+                reported[frame_index] = (pred_x * scale_x, pred_y * scale_y)
+
+        frame_index += 1
+    elapsed = time.perf_counter() - start
+    camera.release()
+    return reported, frame_index, elapsed
+
+
+# --- METRICS ---
+
+def score(reported, truth, frames, match_distance):
+    """Precision/recall, position error and continuity of reported positions against truth"""
+    tp = fp = fn = 0
+    errors = []
+    runs = []
+    run = 0
+    for i in range(frames):
+        output, actual = reported.get(i), truth.get(i)
+        hit = False
+        if output is not None and actual is not None:
+            error = np.hypot(output[0] - actual[0], output[1] - actual[1])
+            hit = error <= match_distance
+            if hit:
+                errors.append(error)
+
+        if hit:
+            tp += 1
+        else:
+            fp += output is not None
+            fn += actual is not None
+
+        # Continuity: lengths of unbroken runs of correct positions while the ball is visible
+        if hit:
+            run += 1
+        elif actual is not None or output is not None:
+            if run:
+                runs.append(run)
+            run = 0
+    if run:
+        runs.append(run)
+
+    return {
+        "tp": tp, "fp": fp, "fn": fn,
+        "errors": errors, "runs": runs,
+        "breaks": max(0, len(runs) - 1),
+    }
+
+
+def summarize(totals, frames, seconds):
+    tp, fp, fn = totals["tp"], totals["fp"], totals["fn"]
+    errors, runs = totals["errors"], totals["runs"]
+    return {
+        "precision": tp / (tp + fp) if tp + fp else 0.0,
+        "recall": tp / (tp + fn) if tp + fn else 0.0,
+        "mean_error": float(np.mean(errors)) if errors else float("nan"),
+        "p95_error": float(np.percentile(errors, 95)) if errors else float("nan"),
+        "track_breaks": totals["breaks"],
+        "mean_run": float(np.mean(runs)) if runs else 0.0,
+        "fps": frames / seconds if seconds else 0.0,
+    }
+
+
+def pareto_front(results):
+    """Configurations no other configuration beats on both FPS and F1"""
+    def f1(r):
+        p, rc = r["precision"], r["recall"]
+        return 2 * p * rc / (p + rc) if p + rc else 0.0
+
+    front = set()
+    for i, r in enumerate(results):
+        dominated = any(
+            o["fps"] >= r["fps"] and f1(o) >= f1(r) and (o["fps"] > r["fps"] or f1(o) > f1(r))
+            for j, o in enumerate(results) if j != i
+        )
+        if not dominated:
+            front.add(i)
+    return front
+
+
+def evaluate(clips, configs, match_distance, repeats=3):
+    """Score every configuration on every clip.
+
+    Each clip is first run once untimed as a warm-up (decoder, caches, lazy
+    OpenCV init); its output is what gets scored, since tracking is
+    deterministic. The FPS comes from the median time of `repeats` further runs.
+    """
+    results = []
+    for config in configs:
+        totals = {"tp": 0, "fp": 0, "fn": 0, "errors": [], "runs": [], "breaks": 0}
+        frames = 0
+        seconds = 0.0
+        for video_path, truth in clips:
+            reported, n, _ = run_configuration(video_path, config)
+            timings = [run_configuration(video_path, config)[2] for _ in range(repeats)]
+            clip_score = score(reported, truth, n, match_distance)
+            for key in totals:
+                totals[key] += clip_score[key]
+            frames += n
+            seconds += float(np.median(timings))
+        result = dict(config=config_name(config), **summarize(totals, frames, seconds))
+        results.append(result)
+        print(f"  {result['config']:<42} {result['fps']:7.1f} fps  "
+              f"P={result['precision']:.3f} R={result['recall']:.3f}")
+    return results
+
+
+def print_report(results):
+    front = pareto_front(results)
+    order = sorted(range(len(results)), key=lambda i: results[i]["fps"])
+    print("")
+    print(f"{'configuration':<42} {'fps':>7} {'prec':>6} {'recall':>6} {'err':>6} {'p95':>6} {'breaks':>6} {'run':>6}")
+    for i in order:
+        r = results[i]
+        marker = " *" if i in front else ""
+        print(f"{r['config']:<42} {r['fps']:7.1f} {r['precision']:6.3f} {r['recall']:6.3f} "
+              f"{r['mean_error']:6.1f} {r['p95_error']:6.1f} {r['track_breaks']:6d} {r['mean_run']:6.1f}{marker}")
+    print("\n* = on the speed/accuracy Pareto front (no configuration is both faster and more accurate)")
+
+
+def write_report(results, path):
+    front = pareto_front(results)
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(results[0]) + ["pareto"])
+        writer.writeheader()
+        for i, r in enumerate(results):
+            writer.writerow(dict(r, pareto=int(i in front)))
+
+
+def parse_resolution(value):
+    width, height = value.lower().split("x")
+    return int(width), int(height)
+
+
+def parse_positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+def parse_switch(value):
+    return {"on": [True], "off": [False], "both": [False, True]}[value]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-v", "--video", action="append", default=[], help="video to evaluate (repeatable, paired with --truth)")
+    ap.add_argument("-t", "--truth", action="append", default=[], help="ground-truth CSV for the matching --video")
+    ap.add_argument("--synthetic", type=int, default=0, help="number of synthetic clips with known truth to generate and add")
+    ap.add_argument("--synthetic-dir", help="where to write synthetic clips (default: a temp directory)")
+    ap.add_argument("--resolutions", type=parse_resolution, nargs="+", default=[(600, 400), (400, 266), (300, 200)],
+                    help="processing resolutions, e.g. 600x400 300x200")
+    ap.add_argument("--strides", type=parse_positive_int, nargs="+", default=[1, 2], help="run the detector every Nth frame")
+    ap.add_argument("--roi", type=parse_switch, default=parse_switch("both"), help="ROI search around the prediction: on, off or both")
+    ap.add_argument("--motion-gating", type=parse_switch, default=parse_switch("both"), help="skip static frames: on, off or both")
+    ap.add_argument("--repeats", type=parse_positive_int, default=3, help="timed runs per configuration and clip (median is reported)")
+    ap.add_argument("--match-distance", type=float, default=20.0, help="max error in source pixels for a correct position")
+    ap.add_argument("--report", help="optional CSV file for the results")
+    args = vars(ap.parse_args())
+
+    if len(args["video"]) != len(args["truth"]):
+        ap.error("every --video needs a matching --truth")
+
+    clips = [(video, load_truth(truth)) for video, truth in zip(args["video"], args["truth"])]
+    if args["synthetic"]:
+        directory = args["synthetic_dir"] or tempfile.mkdtemp(prefix="tennis_eval_")
+        os.makedirs(directory, exist_ok=True)
+        for seed in range(args["synthetic"]):
+            video_path = os.path.join(directory, f"synthetic_{seed}.mp4")
+            truth_path = os.path.join(directory, f"synthetic_{seed}_truth.csv")
+            make_synthetic_clip(video_path, truth_path, seed=seed)
+            clips.append((video_path, load_truth(truth_path)))
+        print(f"Generated {args['synthetic']} synthetic clip(s) in {directory}")
+    if not clips:
+        ap.error("nothing to evaluate: pass --video/--truth pairs or --synthetic N")
+
+    configs = [
+        {"resolution": resolution, "stride": stride, "roi": roi, "motion_gating": gating}
+        for resolution, stride, roi, gating in itertools.product(
+            args["resolutions"], args["strides"], args["roi"], args["motion_gating"])
+    ]
+    print(f"Evaluating {len(configs)} configuration(s) on {len(clips)} clip(s)")
+    results = evaluate(clips, configs, args["match_distance"], args["repeats"])
+
+    print_report(results)
+    if args["report"]:
+        write_report(results, args["report"])
+        print(f"Report written to {args['report']}")
+
+
+if __name__ == "__main__":
+    main()
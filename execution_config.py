@@ -0,0 +1,140 @@
+# execution_config.py
+#
+# Shared execution settings for the CLI tracker and the GUI.
+# OpenCV and the BLAS library behind NumPy each start their own thread pool
+# sized to every core on the machine. That is fine for a single tracker, but
+# when several trackers (or a process pool) run side by side the pools fight
+# over the same cores and throughput flattens. Here we size those pools to
+# the share of cores each worker actually owns, optionally pin the worker to
+# that share, and report which optimized code paths OpenCV was built with.
+
+import multiprocessing
+import os
+
+import cv2
+
+# Environment variables read by the common BLAS/OpenMP runtimes when they start
+NUMPY_THREAD_ENV_VARS = (
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+)
+
+
+def available_cores():
+    """Return the CPU ids this process is allowed to run on"""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def threads_per_worker(workers, cores=None):
+    """Split the available cores evenly between the workers (at least 1 each)"""
+    if cores is None:
+        cores = available_cores()
+    return max(1, len(cores) // max(1, workers))
+
+
+def worker_cores(worker_index, workers, cores=None):
+    """Return the slice of cores owned by one worker"""
+    if cores is None:
+        cores = available_cores()
+    share = threads_per_worker(workers, cores)
+    start = ((worker_index % max(1, workers)) * share) % len(cores)
+    return cores[start:start + share]
+
+
+def pin_to_cores(cores):
+    """Restrict the current process to the given cores. Returns False if unsupported"""
+    if not hasattr(os, "sched_setaffinity"):
+        return False
+    try:
+        os.sched_setaffinity(0, cores)
+    except OSError:
+        return False
+    return True
+
+
+def limit_numpy_threads(threads):
+    """Limit the BLAS/OpenMP pools used by NumPy. Returns False if that wasn't possible.
+
+    By the time this runs, cv2 (and with it NumPy) is already imported and its
+    pools exist, so the limit is applied through threadpoolctl (listed in the
+    requirements files). The environment variables are still set so that
+    processes started from here inherit the same limit.
+    """
+    for var in NUMPY_THREAD_ENV_VARS:
+        os.environ[var] = str(threads)
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        return False
+    threadpool_limits(limits=threads)
+    return True
+
+
+def simd_report():
+    """Pull the CPU feature and threading lines out of cv2.getBuildInformation()"""
+    report = {}
+    keys = {
+        "Baseline:": "baseline",
+        "Dispatched code generation:": "dispatched",
+        "Parallel framework:": "parallel_framework",
+    }
+    for line in cv2.getBuildInformation().splitlines():
+        line = line.strip()
+        for prefix, name in keys.items():
+            if line.startswith(prefix) and name not in report:
+                report[name] = line[len(prefix):].strip()
+    return report
+
+
+def configure_execution(workers=1, worker_index=0, pin_cores=False, verbose=True):
+    """Configure OpenCV/NumPy threading for one of `workers` concurrent trackers.
+
+    Returns the number of threads OpenCV was told to use.
+    """
+    cores = available_cores()
+    threads = threads_per_worker(workers, cores)
+
+    pinned = False
+    if pin_cores:
+        pinned = pin_to_cores(worker_cores(worker_index, workers, cores))
+
+    numpy_limited = limit_numpy_threads(threads)
+    cv2.setUseOptimized(True)
+    cv2.setNumThreads(threads)
+
+    if verbose:
+        report = simd_report()
+        print(f"[exec] OpenCV {cv2.__version__}, optimized: {cv2.useOptimized()}, "
+              f"threads: {cv2.getNumThreads()} ({len(cores)} cores / {workers} worker(s))")
+        if not numpy_limited:
+            print("[exec] threadpoolctl not installed: NumPy thread pools are not limited")
+        if pin_cores:
+            status = f"cores {worker_cores(worker_index, workers, cores)}" if pinned else "not supported on this platform"
+            print(f"[exec] Worker {worker_index} pinning: {status}")
+        print(f"[exec] SIMD baseline: {report.get('baseline', 'unknown')}")
+        print(f"[exec] SIMD dispatched: {report.get('dispatched', 'unknown')}")
+        print(f"[exec] Parallel framework: {report.get('parallel_framework', 'unknown')}")
+
+    return threads
+
+
+def pool_initargs(workers, pin_cores=False):
+    """initargs for pool_initializer, with a fresh counter that hands out worker indices"""
+    return (workers, multiprocessing.Value("i", 0), pin_cores)
+
+
+def pool_initializer(workers, counter, pin_cores=False):
+    """Initializer for multiprocessing pools: configures each worker process on start.
+
+    Each worker takes the next index from the shared counter, so the indices
+    are 0..workers-1 for every pool (replacement workers wrap around).
+    """
+    with counter.get_lock():
+        worker_index = counter.value % workers
+        counter.value += 1
+    configure_execution(workers, worker_index, pin_cores, verbose=False)
@@ -2,29 +2,18 @@ import customtkinter as ctk
 import tkinter as tk
 from tkinter import filedialog, messagebox
 import cv2
-import numpy as np
 import threading
 import time
 from PIL import Image, ImageTk
 import os
 
+from execution_config import configure_execution
+from track_ball import DETECTOR_PARAMS, track_video
+
 # Set the appearance mode and color theme
 ctk.set_appearance_mode("dark")
 ctk.set_default_color_theme("dark-blue")
 
-class KalmanFilter:
-    def __init__(self):
-        self.kf = cv2.KalmanFilter(4, 2)
-        self.kf.measurementMatrix = np.array([[1, 0, 0, 0], [0, 1, 0, 0]], np.float32)
-        self.kf.transitionMatrix = np.array([[1, 0, 1, 0], [0, 1, 0, 1], [0, 0, 1, 0], [0, 0, 0, 1]], np.float32)
-        self.kf.processNoiseCov = np.array([[1, 0, 0, 0], [0, 1, 0, 0], [0, 0, 1, 0], [0, 0, 0, 1]], np.float32) * 0.03
-    
-    def predict(self):
-        return self.kf.predict()
-
-    def update(self, coord):
-        return self.kf.correct(coord)
-
 class TennisBallTrackerGUI:
     def __init__(self):
         # Initialize the main window
@@ -57,13 +46,29 @@ class TennisBallTrackerGUI:
         self.video_cap = None
         self.is_playing = False
         self.current_frame = None
-        self.kf = None
         self.processing_complete = False
         
+        # Precomputed tracking results and timeline state
+        self.track = None
+        self.frame_index = 0
+        self.frame_count = 0
+        self.capture_position = 0
+        self.video_fps = 30.0
+        self.playback_speed = 1.0
+        self.playback_speeds = ["0.25x", "0.5x", "1x", "2x", "4x", "8x"]
+        self.trail_length = 20
+        self.play_job = None
+        # Wall-clock reference for playback: frame shown at clock_start
+        self.clock_start = 0.0
+        self.clock_frame = 0
+        
         # Tennis ball detection parameters
         self.greenLower = (29, 86, 6)
         self.greenUpper = (64, 255, 255)
         
+        # The GUI runs a single tracker, so it gets every core
+        configure_execution(workers=1)
+        
         self.setup_ui()
         
     def setup_ui(self):
@@ -253,6 +258,36 @@ class TennisBallTrackerGUI:
         )
         self.video_label.pack(expand=True, padx=10, pady=10)
         
+        # Timeline scrubber backed by the precomputed results
+        self.timeline_frame = ctk.CTkFrame(
+            self.video_frame,
+            fg_color="transparent",
+            height=40
+        )
+        self.timeline_frame.pack(fill="x", padx=20, pady=(0, 10))
+        
+        self.timeline_slider = ctk.CTkSlider(
+            self.timeline_frame,
+            from_=0,
+            to=1,
+            command=self.seek_to_frame,
+            progress_color=self.colors["accent"],
+            button_color=self.colors["accent"],
+            button_hover_color=self.colors["accent_hover"],
+            fg_color=self.colors["border"]
+        )
+        self.timeline_slider.pack(side="left", fill="x", expand=True, padx=(0, 15))
+        self.timeline_slider.set(0)
+        
+        self.timeline_label = ctk.CTkLabel(
+            self.timeline_frame,
+            text="0 / 0",
+            font=ctk.CTkFont(size=12, weight="bold"),
+            text_color=self.colors["text_secondary"],
+            width=110
+        )
+        self.timeline_label.pack(side="right")
+        
         # Control panel with modern buttons
         self.control_frame = ctk.CTkFrame(
             self.video_frame, 
@@ -315,6 +350,20 @@ class TennisBallTrackerGUI:
         )
         self.new_video_button.pack(side="left", padx=10)
         
+        self.speed_selector = ctk.CTkSegmentedButton(
+            self.control_buttons_frame,
+            values=self.playback_speeds,
+            command=self.set_playback_speed,
+            selected_color=self.colors["accent"],
+            selected_hover_color=self.colors["accent_hover"],
+            unselected_color=self.colors["bg_tertiary"],
+            text_color=self.colors["text_primary"],
+            font=ctk.CTkFont(size=12, weight="bold"),
+            height=40
+        )
+        self.speed_selector.pack(side="left", padx=10)
+        self.speed_selector.set("1x")
+        
     def is_video_file(self, file_path):
         """Check if file can be opened by OpenCV (any format OpenCV supports)"""
         try:
@@ -361,43 +410,58 @@ class TennisBallTrackerGUI:
         self.upload_frame.pack_forget()
         self.progress_frame.pack(fill="x", padx=30, pady=(0, 20))
         
-        # Start processing animation
-        self.start_processing_animation()
+        # Track the whole video up front so playback never runs detection
+        self.start_prepass()
     
-    def start_processing_animation(self):
-        def animate_progress():
-            processing_steps = [
-                ("🔍 Analyzing video properties...", 0.2),
-                ("🎯 Initializing tennis ball detection...", 0.5),
-                ("🧠 Loading AI tracking models...", 0.8),
-                ("✅ Processing complete - Ready to track!", 1.0)
-            ]
-            
-            for i, (step, target_progress) in enumerate(processing_steps):
-                if not hasattr(self, 'root') or not self.root.winfo_exists():
-                    return
-                    
-                self.progress_status_label.configure(text=step)
-                
-                # Smooth progress bar animation
-                current_progress = self.progress_bar.get()
-                steps = 20
-                for j in range(steps):
-                    if not hasattr(self, 'root') or not self.root.winfo_exists():
-                        return
-                    progress = current_progress + (target_progress - current_progress) * (j + 1) / steps
-                    self.progress_bar.set(progress)
-                    self.root.update()
-                    time.sleep(0.04)  # Adjusted for 3-4 second total duration
-                
-                time.sleep(0.8 if i < len(processing_steps) - 1 else 0.5)
-            
-            # Complete processing
-            time.sleep(0.3)
-            self.root.after(0, self.initialize_video_playback)
+    def start_prepass(self):
+        """Track the whole video in the background, then start playback from the results"""
+        video_path = self.video_path
+        params = dict(DETECTOR_PARAMS, greenLower=self.greenLower, greenUpper=self.greenUpper)
+        
+        cap = cv2.VideoCapture(video_path)
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) if cap.isOpened() else 0
+        cap.release()
+        
+        self.progress_bar.set(0)
+        self.progress_status_label.configure(text="🔍 Analyzing video properties...")
+        
+        def update_progress(done):
+            # Keep the UI responsive: only report every few frames
+            if done % 10 or video_path != self.video_path:
+                return
+            fraction = min(done / total_frames, 1.0) if total_frames > 0 else 0
+            text = f"🎯 Tracking tennis ball... frame {done}" + (f" / {total_frames}" if total_frames > 0 else "")
+            self.root.after(0, lambda: (self.progress_bar.set(fraction),
+                                        self.progress_status_label.configure(text=text)))
+        
+        def prepass():
+            try:
+                track = track_video(video_path, params, progress=update_progress)
+            except Exception as e:
+                error = str(e)
+                self.root.after(0, lambda: self.prepass_failed(error))
+                return
+            self.root.after(0, lambda: self.prepass_complete(video_path, track))
+        
+        threading.Thread(target=prepass, daemon=True).start()
+    
+    def prepass_complete(self, video_path, track):
+        # Ignore results for a video that was replaced while it was being tracked
+        if video_path != self.video_path:
+            return
+        if len(track["frame"]) == 0:
+            self.prepass_failed("No frames could be read from the video")
+            return
         
-        # Run animation in separate thread
-        threading.Thread(target=animate_progress, daemon=True).start()
+        self.track = track
+        self.processing_complete = True
+        self.progress_bar.set(1.0)
+        self.progress_status_label.configure(text="✅ Processing complete - Ready to track!")
+        self.root.after(300, self.initialize_video_playback)
+    
+    def prepass_failed(self, error):
+        messagebox.showerror("Processing Error", f"Failed to track video:\\n\\n{error}")
+        self.reset_to_upload()
     
     def initialize_video_playback(self):
         try:
@@ -407,23 +471,29 @@ class TennisBallTrackerGUI:
                 self.reset_to_upload()
                 return
             
-            # Initialize Kalman filter
-            self.kf = KalmanFilter()
+            # Timeline covers the frames the pre-pass actually decoded
+            self.frame_count = len(self.track["frame"])
+            self.video_fps = self.video_cap.get(cv2.CAP_PROP_FPS) or 30.0
+            self.capture_position = 0
+            self.timeline_slider.configure(to=max(self.frame_count - 1, 1), number_of_steps=max(self.frame_count - 1, 1))
             
             # Hide progress and show video
             self.progress_frame.pack_forget()
             self.video_frame.pack(fill="both", expand=True, padx=30, pady=(0, 30))
             
             # Start video playback
+            self.show_frame(0)
+            self.sync_clock()
             self.is_playing = True
-            self.play_video()
+            self.play_pause_button.configure(text="⏸️ PAUSE")
+            self.schedule_next_frame()
             
         except Exception as e:
             messagebox.showerror("Initialization Error", f"Failed to initialize video playback:\\n\\n{str(e)}")
             self.reset_to_upload()
     
-    def process_frame(self, frame):
-        """Process frame with tennis ball tracking and enhanced visualization with orange/green contrast"""
+    def process_frame(self, frame, index):
+        """Draw the precomputed tracking results for frame `index` with orange/green contrast"""
         # Get window dimensions for responsive sizing
         window_width = self.video_label.winfo_width() if self.video_label.winfo_width() > 1 else 800
         window_height = self.video_label.winfo_height() if self.video_label.winfo_height() > 1 else 600
@@ -441,40 +511,36 @@ class TennisBallTrackerGUI:
             
         frame = cv2.resize(frame, (new_width, new_height))
         
-        # Tennis ball detection
-        blurred = cv2.GaussianBlur(frame, (11, 11), 0)
-        hsv = cv2.cvtColor(blurred, cv2.COLOR_BGR2HSV)
-        mask = cv2.inRange(hsv, self.greenLower, self.greenUpper)
-        mask = cv2.erode(mask, None, iterations=2)
-        mask = cv2.dilate(mask, None, iterations=2)
-        
-        contours, _ = cv2.findContours(mask.copy(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        
-        # Kalman filter prediction
-        predicted_coords = self.kf.predict()
-        
-        # Enhanced visualization with orange (detected) and green (predicted) contrast
-        detection_found = False
-        if len(contours) > 0:
-            c = max(contours, key=cv2.contourArea)
-            ((x, y), radius) = cv2.minEnclosingCircle(c)
+        # Results are in the pre-pass processing resolution
+        scale_x = new_width / DETECTOR_PARAMS["width"]
+        scale_y = new_height / DETECTOR_PARAMS["height"]
+        track = self.track
+        
+        # Trail of recent detections, brighter towards the current frame
+        start = max(0, index - self.trail_length)
+        trail = [
+            (int(track["x"][i] * scale_x), int(track["y"][i] * scale_y))
+            for i in range(start, index + 1) if track["detected"][i]
+        ]
+        for i in range(1, len(trail)):
+            strength = i / len(trail)
+            color = (int(17 * strength), int(163 * strength), int(252 * strength))
+            cv2.line(frame, trail[i - 1], trail[i], color, max(1, int(4 * strength)))
+        
+        # Detection with ORANGE accent (BGR format: B=17, G=163, R=252 for #fca311)
+        detection_found = bool(track["detected"][index])
+        if detection_found:
+            x, y = track["x"][index] * scale_x, track["y"][index] * scale_y
+            radius = track["radius"][index] * scale_x
+            cv2.circle(frame, (int(x), int(y)), int(radius), (17, 163, 252), 3)  # Orange detection
+            cv2.circle(frame, (int(x), int(y)), int(radius + 5), (50, 180, 255), 1)  # Outer glow
             
-            if radius > 10:
-                detection_found = True
-                # Update Kalman filter with detection
-                measurement = np.array([[np.float32(x)], [np.float32(y)]])
-                self.kf.update(measurement)
-                
-                # Draw detection circle with ORANGE accent (BGR format: B=17, G=163, R=252 for #fca311)
-                cv2.circle(frame, (int(x), int(y)), int(radius), (17, 163, 252), 3)  # Orange detection
-                cv2.circle(frame, (int(x), int(y)), int(radius + 5), (50, 180, 255), 1)  # Outer glow
-                
-                # Add detection label with orange color
-                cv2.putText(frame, "DETECTED", (int(x) - 40, int(y) - int(radius) - 20), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.7, (17, 163, 252), 2)
+            # Add detection label with orange color
+            cv2.putText(frame, "DETECTED", (int(x) - 40, int(y) - int(radius) - 20), 
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, (17, 163, 252), 2)
         
         # Draw Kalman filter prediction with GREEN (BGR format: B=83, G=200, R=0 for #00C853)
-        pred_x, pred_y = int(predicted_coords[0]), int(predicted_coords[1])
+        pred_x, pred_y = int(track["pred_x"][index] * scale_x), int(track["pred_y"][index] * scale_y)
         cv2.circle(frame, (pred_x, pred_y), 8, (83, 200, 0), 2)  # Green prediction
         cv2.circle(frame, (pred_x, pred_y), 12, (100, 220, 0), 1)  # Prediction outer ring
         
@@ -497,22 +563,41 @@ class TennisBallTrackerGUI:
         
         return frame
     
-    def play_video(self):
-        if not self.is_playing or not self.video_cap:
+    def read_frame(self, index):
+        """Read frame `index`, grabbing forward for short hops and seeking for long ones.
+
+        Returns (frame, actual_index): seeks are only approximate for many
+        codecs, so the index is the frame the capture really returned.
+        """
+        skip = index - self.capture_position
+        if skip < 0 or skip > 16:
+            self.video_cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+            position = int(self.video_cap.get(cv2.CAP_PROP_POS_FRAMES))
+            # Landed short of the target (e.g. on a keyframe): step forward to it
+            for _ in range(max(0, index - position)):
+                self.video_cap.grab()
+            position = max(position, index) if position >= 0 else index
+        else:
+            # grab() still decodes (FFmpeg), it only skips the color conversion and copy
+            for _ in range(skip):
+                self.video_cap.grab()
+            position = index
+        ret, frame = self.video_cap.read()
+        position = min(position, self.frame_count - 1)
+        self.capture_position = position + 1
+        return (frame if ret else None), position
+    
+    def show_frame(self, index):
+        if not self.video_cap or self.track is None:
             return
         
-        ret, frame = self.video_cap.read()
-        if not ret:
-            # Restart video for endless loop
-            self.video_cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-            ret, frame = self.video_cap.read()
-            # Reset Kalman filter for new loop
-            if self.kf:
-                self.kf = KalmanFilter()
-        
-        if ret:
-            # Process frame with tennis ball tracking
-            processed_frame = self.process_frame(frame)
+        index = max(0, min(int(index), self.frame_count - 1))
+        frame, index = self.read_frame(index)
+        self.frame_index = index
+        
+        if frame is not None:
+            # Overlay the precomputed tracking results
+            processed_frame = self.process_frame(frame, index)
             
             # Convert to RGB and then to PhotoImage
             frame_rgb = cv2.cvtColor(processed_frame, cv2.COLOR_BGR2RGB)
@@ -523,8 +608,53 @@ class TennisBallTrackerGUI:
             self.video_label.configure(image=frame_tk)
             self.video_label.image = frame_tk  # Keep a reference
         
-        # Schedule next frame (30 FPS)
-        self.root.after(33, self.play_video)
+        self.timeline_slider.set(index)
+        self.timeline_label.configure(text=f"{index + 1} / {self.frame_count}")
+    
+    def play_video(self):
+        self.play_job = None
+        if not self.is_playing or not self.video_cap:
+            return
+        
+        # The frame to show comes from elapsed wall-clock time, so drawing time
+        # and timer jitter never change the playback speed (frames are skipped instead)
+        elapsed = time.perf_counter() - self.clock_start
+        target = self.clock_frame + int(elapsed * self.video_fps * self.playback_speed)
+        if target >= self.frame_count:
+            # Restart video for endless loop
+            self.show_frame(target % self.frame_count)
+            self.sync_clock()
+        elif target != self.frame_index:
+            self.show_frame(target)
+        
+        self.schedule_next_frame()
+    
+    def tick_interval(self):
+        """Milliseconds between playback ticks: one per frame, but no faster than Tk can manage (~15ms)"""
+        return max(15, int(1000 / (self.video_fps * self.playback_speed)))
+    
+    def sync_clock(self):
+        """Restart the playback clock from the frame currently shown"""
+        self.clock_start = time.perf_counter()
+        self.clock_frame = self.frame_index
+    
+    def schedule_next_frame(self):
+        if self.play_job is not None:
+            self.root.after_cancel(self.play_job)
+        self.play_job = self.root.after(self.tick_interval(), self.play_video)
+    
+    def seek_to_frame(self, value):
+        """Timeline callback: jump straight to a frame using the precomputed results"""
+        if not self.video_cap:
+            return
+        self.show_frame(round(value))
+        self.sync_clock()
+    
+    def set_playback_speed(self, value):
+        self.playback_speed = float(value.rstrip("x"))
+        self.sync_clock()
+        if self.is_playing:
+            self.schedule_next_frame()
     
     def toggle_playback(self):
         if not self.video_cap:
@@ -534,16 +664,16 @@ class TennisBallTrackerGUI:
         if self.is_playing:
             self.play_pause_button.configure(text="⏸️ PAUSE")
             self.tracking_status_label.configure(text="● ACTIVE", text_color=self.colors["accent_secondary"])
-            self.play_video()
+            self.sync_clock()
+            self.schedule_next_frame()
         else:
             self.play_pause_button.configure(text="▶️ PLAY")
             self.tracking_status_label.configure(text="● PAUSED", text_color=self.colors["warning"])
     
     def restart_video(self):
         if self.video_cap:
-            self.video_cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-            if self.kf:
-                self.kf = KalmanFilter()  # Reset Kalman filter
+            self.show_frame(0)
+            self.sync_clock()
             self.tracking_status_label.configure(text="● RESTARTED", text_color=self.colors["accent"])
             # Reset status after a moment
             self.root.after(1000, lambda: self.tracking_status_label.configure(text="● ACTIVE", text_color=self.colors["accent_secondary"]))
@@ -556,6 +686,9 @@ class TennisBallTrackerGUI:
         """Reset the interface to the upload state"""
         # Stop current video
         self.is_playing = False
+        if self.play_job is not None:
+            self.root.after_cancel(self.play_job)
+            self.play_job = None
         if self.video_cap:
             self.video_cap.release()
             self.video_cap = None
@@ -574,7 +707,9 @@ class TennisBallTrackerGUI:
         
         # Reset variables
         self.video_path = None
-        self.kf = None
+        self.track = None
+        self.frame_index = 0
+        self.frame_count = 0
         self.processing_complete = False
     
     def run(self):
@@ -1,12 +1,17 @@
 # track_ball.py
 
 import argparse
+import os
 import cv2
 import numpy as np
 
+from detection_cache import CandidateCache
+from execution_config import configure_execution
+from tracking_results import FIELDS, TrackWriter
+
 # --- NEW: KALMAN FILTER CLASS ---
 class KalmanFilter:
-    def __init__(self):
+    def __init__(self, process_noise=0.03):
         # State transition matrix (A)
         # We model position and velocity, so it's a 4-state system [x, y, vx, vy]
         self.kf = cv2.KalmanFilter(4, 2)
@@ -14,8 +19,8 @@ class KalmanFilter:
         # Transition matrix: defines how the state evolves
         self.kf.transitionMatrix = np.array([[1, 0, 1, 0], [0, 1, 0, 1], [0, 0, 1, 0], [0, 0, 0, 1]], np.float32)
         # Process noise: uncertainty in our model
-        self.kf.processNoiseCov = np.array([[1, 0, 0, 0], [0, 1, 0, 0], [0, 0, 1, 0], [0, 0, 0, 1]], np.float32) * 0.03
-    
+        self.kf.processNoiseCov = np.array([[1, 0, 0, 0], [0, 1, 0, 0], [0, 0, 1, 0], [0, 0, 0, 1]], np.float32) * process_noise
+
     def predict(self):
         # Predicts the next state
         return self.kf.predict()
@@ -26,64 +31,231 @@ class KalmanFilter:
 
 # --- END OF NEW CLASS ---
 
-# Argument parser (no changes)
-ap = argparse.ArgumentParser()
-ap.add_argument("-v", "--video", required=True, help="path to the input video file")
-args = vars(ap.parse_args())
-
-# Color range (no changes)
-greenLower = (29, 86, 6)
-greenUpper = (64, 255, 255)
-
-# Load video (no changes)
-camera = cv2.VideoCapture(args["video"])
-if not camera.isOpened():
-    print("Error: Could not open video file.")
-    exit()
-
-# --- NEW: INITIALIZE THE KALMAN FILTER ---
-kf = KalmanFilter()
-predicted_coords = np.zeros((2, 1), np.float32)
-# ---
-
-# Main tracking loop
-while True:
-    (grabbed, frame) = camera.read()
-    if not grabbed:
-        break
-
-    frame = cv2.resize(frame, (600, 400))
-    blurred = cv2.GaussianBlur(frame, (11, 11), 0)
+# Upstream detector parameters: they decide which contour candidates exist,
+# so they are part of the candidate cache key
+DETECTOR_PARAMS = {
+    "width": 600,
+    "height": 400,
+    "greenLower": (29, 86, 6),
+    "greenUpper": (64, 255, 255),
+    "blur": 11,
+    "erode": 2,
+    "dilate": 2,
+}
+
+# Downstream parameters only act on the candidate lists, so changing them
+# can replay from the cache
+MIN_RADIUS = 10
+PROCESS_NOISE = 0.03
+
+
+def detect_candidates(frame, params=DETECTOR_PARAMS, roi=None):
+    """Run the color detector on a frame.
+
+    Returns the resized frame and an (N, 4) array of [x, y, radius, area],
+    one row per external contour in the mask. An optional roi (x0, y0, x1, y1)
+    in resized coordinates limits the search to that window.
+    """
+    frame = cv2.resize(frame, (params["width"], params["height"]))
+    x0, y0 = 0, 0
+    search = frame
+    if roi is not None:
+        x0, y0, x1, y1 = roi
+        search = frame[y0:y1, x0:x1]
+
+    blurred = cv2.GaussianBlur(search, (params["blur"], params["blur"]), 0)
     hsv = cv2.cvtColor(blurred, cv2.COLOR_BGR2HSV)
-    mask = cv2.inRange(hsv, greenLower, greenUpper)
-    mask = cv2.erode(mask, None, iterations=2)
-    mask = cv2.dilate(mask, None, iterations=2)
-    
-    contours, _ = cv2.findContours(mask.copy(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-
-    # --- UPDATED LOGIC ---
-    # Call predict at the start of each loop
-    predicted_coords = kf.predict()
-
-    if len(contours) > 0:
-        c = max(contours, key=cv2.contourArea)
+    mask = cv2.inRange(hsv, tuple(params["greenLower"]), tuple(params["greenUpper"]))
+    mask = cv2.erode(mask, None, iterations=params["erode"])
+    mask = cv2.dilate(mask, None, iterations=params["dilate"])
+
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    candidates = np.zeros((len(contours), 4), np.float32)
+    for i, c in enumerate(contours):
         ((x, y), radius) = cv2.minEnclosingCircle(c)
-        
-        if radius > 10:
-            # We have a detection, so update the filter
-            measurement = np.array([[np.float32(x)], [np.float32(y)]])
-            kf.update(measurement)
-            # Draw the raw detection circle in red
-            cv2.circle(frame, (int(x), int(y)), int(radius), (0, 0, 255), 2)
-    
-    # Draw the Kalman filter's predicted position in green
-    cv2.circle(frame, (int(predicted_coords[0]), int(predicted_coords[1])), 10, (0, 255, 0), 2)
-    # --- END OF UPDATED LOGIC ---
-
-    cv2.imshow("Tennis Ball Tracker", frame)
-    key = cv2.waitKey(1) & 0xFF
-    if key == ord("q"):
-        break
-
-camera.release()
-cv2.destroyAllWindows()
\ No newline at end of file
+        candidates[i] = (x + x0, y + y0, radius, cv2.contourArea(c))
+    return frame, candidates
+
+
+def select_ball(candidates, min_radius=MIN_RADIUS):
+    """Pick the largest contour and accept it if it is big enough. Returns (x, y, radius) or None"""
+    if len(candidates) == 0:
+        return None
+    x, y, radius, _ = candidates[np.argmax(candidates[:, 3])]
+    if radius > min_radius:
+        return (float(x), float(y), float(radius))
+    return None
+
+
+class BallTracker:
+    """One per-frame tracking step: Kalman prediction, then ball selection and correction"""
+    def __init__(self, min_radius=MIN_RADIUS, process_noise=PROCESS_NOISE):
+        self.kf = KalmanFilter(process_noise)
+        self.min_radius = min_radius
+
+    def predict(self):
+        # Call once at the start of every frame; returns the predicted (x, y)
+        predicted_coords = self.kf.predict()
+        return (float(predicted_coords[0, 0]), float(predicted_coords[1, 0]))
+
+    def correct(self, candidates):
+        # Pick the ball and update the filter with it. Returns (x, y, radius) or None.
+        # candidates is None when the detector didn't run on this frame.
+        detection = select_ball(candidates, self.min_radius) if candidates is not None else None
+        if detection is not None:
+            measurement = np.array([[np.float32(detection[0])], [np.float32(detection[1])]])
+            self.kf.update(measurement)
+        return detection
+
+    def step(self, candidates):
+        predicted = self.predict()
+        return self.correct(candidates), predicted
+
+
+def candidate_stream(video_path, params=DETECTOR_PARAMS, cache=None):
+    """Yield (frame, candidates) for every frame of the video.
+
+    With a cache hit the video is not decoded at all and frame is None.
+    On a miss the candidates are stored once the whole video has been read.
+    """
+    if cache is not None:
+        try:
+            cached = cache.load(video_path, params)
+        except OSError:
+            # The cache key needs os.stat() of the video
+            raise IOError(f"Could not open video file: {video_path}")
+        if cached is not None:
+            for candidates in cached:
+                yield None, candidates
+            return
+
+    camera = cv2.VideoCapture(video_path)
+    if not camera.isOpened():
+        raise IOError(f"Could not open video file: {video_path}")
+
+    per_frame = []
+    try:
+        while True:
+            (grabbed, frame) = camera.read()
+            if not grabbed:
+                break
+            frame, candidates = detect_candidates(frame, params)
+            per_frame.append(candidates)
+            yield frame, candidates
+    finally:
+        camera.release()
+
+    # Only reached when the whole video was read (not when the consumer stops early)
+    if cache is not None:
+        cache.save(video_path, params, per_frame)
+
+
+def track_stream(video_path, params=DETECTOR_PARAMS, min_radius=MIN_RADIUS, process_noise=PROCESS_NOISE,
+                 cache=None):
+    """Yield (frame, detection, predicted) for every frame of the video.
+
+    frame is None when replaying from the cache, detection is (x, y, radius)
+    or None, predicted is the Kalman prediction (x, y) made before the update.
+    """
+    tracker = BallTracker(min_radius, process_noise)
+    for frame, candidates in candidate_stream(video_path, params, cache):
+        detection, predicted = tracker.step(candidates)
+        yield frame, detection, predicted
+
+
+def track_video(video_path, params=DETECTOR_PARAMS, min_radius=MIN_RADIUS, process_noise=PROCESS_NOISE,
+                cache=None, progress=None):
+    """Track a whole video without display.
+
+    Returns a dict of per-frame numpy arrays with the same columns as
+    tracking_results.load_track. progress, if given, is called with the
+    number of frames processed so far.
+    """
+    rows = []
+    stream = track_stream(video_path, params, min_radius, process_noise, cache)
+    for frame_index, (_, detection, predicted) in enumerate(stream):
+        rows.append((frame_index, detection is not None) + (detection or (np.nan, np.nan, np.nan)) + predicted)
+        if progress:
+            progress(frame_index + 1)
+
+    table = np.array(rows, np.float64).reshape(-1, len(FIELDS))
+    track = {name: table[:, i] for i, name in enumerate(FIELDS)}
+    track["frame"] = track["frame"].astype(np.int64)
+    track["detected"] = track["detected"].astype(bool)
+    return track
+
+
+def main():
+    # Argument parser
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-v", "--video", required=True, help="path to the input video file")
+    ap.add_argument("-w", "--workers", type=int, default=1, help="number of trackers running concurrently on this machine")
+    ap.add_argument("--worker-index", type=int, default=0, help="index of this tracker among the concurrent workers")
+    ap.add_argument("--pin-cores", action="store_true", help="pin this tracker to its share of the CPU cores")
+    ap.add_argument("-o", "--output", help="optional CSV file to store per-frame tracking results")
+    ap.add_argument("--cache-dir", help="directory for cached detector candidates (replays without decoding when only downstream parameters change)")
+    ap.add_argument("--no-display", action="store_true", help="don't show the video window")
+    ap.add_argument("--green-lower", type=int, nargs=3, default=DETECTOR_PARAMS["greenLower"], help="lower HSV bound")
+    ap.add_argument("--green-upper", type=int, nargs=3, default=DETECTOR_PARAMS["greenUpper"], help="upper HSV bound")
+    ap.add_argument("--erode", type=int, default=DETECTOR_PARAMS["erode"], help="erode iterations")
+    ap.add_argument("--dilate", type=int, default=DETECTOR_PARAMS["dilate"], help="dilate iterations")
+    ap.add_argument("--min-radius", type=float, default=MIN_RADIUS, help="minimum enclosing radius accepted as the ball")
+    ap.add_argument("--process-noise", type=float, default=PROCESS_NOISE, help="Kalman filter process noise")
+    args = vars(ap.parse_args())
+
+    # Size OpenCV/NumPy thread pools to this worker's share of the cores
+    configure_execution(args["workers"], args["worker_index"], args["pin_cores"])
+
+    params = dict(DETECTOR_PARAMS,
+                  greenLower=tuple(args["green_lower"]),
+                  greenUpper=tuple(args["green_upper"]),
+                  erode=args["erode"],
+                  dilate=args["dilate"])
+    cache = CandidateCache(args["cache_dir"]) if args["cache_dir"] else None
+    if cache is not None:
+        # The cache key stats the video, so a missing file fails here rather than in VideoCapture
+        try:
+            cached = os.path.exists(cache.path(args["video"], params))
+        except OSError:
+            print(f"Error: Could not open video file: {args['video']}")
+            return
+        if cached:
+            print("Replaying detector candidates from cache (video is not decoded, nothing is displayed)")
+
+    # Optional per-frame results file (read by trajectory_query.py)
+    writer = TrackWriter(args["output"]) if args["output"] else None
+
+    try:
+        # Main tracking loop (Kalman predict, then update with the detection if there is one)
+        stream = track_stream(args["video"], params, args["min_radius"], args["process_noise"], cache)
+        for frame_index, (frame, detection, predicted) in enumerate(stream):
+            if writer:
+                writer.write(frame_index, detection, predicted)
+
+            if frame is None or args["no_display"]:
+                continue
+
+            if detection is not None:
+                # Draw the raw detection circle in red
+                x, y, radius = detection
+                cv2.circle(frame, (int(x), int(y)), int(radius), (0, 0, 255), 2)
+            # Draw the Kalman filter's predicted position in green
+            cv2.circle(frame, (int(predicted[0]), int(predicted[1])), 10, (0, 255, 0), 2)
+
+            cv2.imshow("Tennis Ball Tracker", frame)
+            key = cv2.waitKey(1) & 0xFF
+            if key == ord("q"):
+                break
+    except IOError as e:
+        print(f"Error: {e}")
+    finally:
+        if writer:
+            writer.close()
+        # Headless OpenCV builds have no window support at all
+        if not args["no_display"]:
+            cv2.destroyAllWindows()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# tracking_results.py
+#
+# Per-frame tracking results stored as CSV, one file per video.
+# Coordinates are in the tracker's processing resolution (600x400 for the CLI).
+# Frames without a detection keep the Kalman prediction and leave x/y/radius empty.
+
+import csv
+
+import numpy as np
+
+FIELDS = ["frame", "detected", "x", "y", "radius", "pred_x", "pred_y"]
+
+
+class TrackWriter:
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "w", newline="")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(FIELDS)
+
+    def write(self, frame_index, detection, predicted):
+        # detection is (x, y, radius) or None, predicted is (x, y)
+        if detection is not None:
+            x, y, radius = detection
+            row = [frame_index, 1, f"{x:.2f}", f"{y:.2f}", f"{radius:.2f}"]
+        else:
+            row = [frame_index, 0, "", "", ""]
+        row += [f"{predicted[0]:.2f}", f"{predicted[1]:.2f}"]
+        self.writer.writerow(row)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def load_track(path):
+    """Load a results file into a dict of numpy arrays keyed by column name.
+
+    Missing detections become NaN in x/y/radius.
+    """
+    columns = {name: [] for name in FIELDS}
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            for name in FIELDS:
+                value = row[name]
+                columns[name].append(float(value) if value != "" else np.nan)
+
+    track = {name: np.array(values, np.float64) for name, values in columns.items()}
+    track["frame"] = track["frame"].astype(np.int64)
+    track["detected"] = track["detected"].astype(bool)
+    return track
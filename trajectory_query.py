@@ -0,0 +1,291 @@
+# trajectory_query.py
+#
+# Local query service over stored per-frame tracking results (see tracking_results.py).
+# All result files in a directory are loaded once into an in-memory index:
+#   - a sorted frame array per video for frame-range lookups (binary search)
+#   - grid-based spatial buckets of detected positions for region lookups
+#   - rally segments, computed on first use and cached for the default settings
+# so review tools can ask questions across many videos without rescanning files
+# or reprocessing video.
+#
+# Usage:
+#   python trajectory_query.py --tracks results/ --port 8765
+#
+# Endpoints (GET, JSON responses):
+#   /videos
+#   /positions?video=NAME&start=A&end=B
+#   /region?x0=..&y0=..&x1=..&y1=..[&video=NAME]
+#   /rallies?min_shots=N[&video=NAME][&max_gap=FRAMES][&min_move=PIXELS]
+
+import argparse
+import json
+import math
+import os
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from tracking_results import load_track
+
+# Rally defaults: longest detection gap inside a rally (frames), and how far the
+# ball must travel back (pixels) before a change of direction counts as a shot
+MAX_GAP = 15
+MIN_MOVE = 8.0
+
+
+class UnknownVideoError(LookupError):
+    pass
+
+
+def finite_float(text, name):
+    """Parse a query parameter as a float, rejecting NaN and infinity"""
+    value = float(text)
+    if not math.isfinite(value):
+        raise ValueError(f"{name} must be a finite number, got {text}")
+    return value
+
+
+def non_negative(value, name):
+    if value < 0:
+        raise ValueError(f"{name} must be >= 0, got {value}")
+    return value
+
+
+def count_reversals(values, min_move=MIN_MOVE):
+    """Count direction changes in a 1-D path, ignoring moves shorter than min_move.
+
+    The current direction only flips once the path has come back at least
+    min_move from its furthest point, so jitter while the ball is slow or
+    held doesn't register.
+    """
+    direction = 0
+    extreme = values[0]
+    reversals = 0
+    for value in values[1:]:
+        if direction == 0:
+            if abs(value - extreme) >= min_move:
+                direction = 1 if value > extreme else -1
+                extreme = value
+        elif (value - extreme) * direction > 0:
+            extreme = value
+        elif (extreme - value) * direction >= min_move:
+            reversals += 1
+            direction = -direction
+            extreme = value
+    return reversals
+
+
+class VideoTrack:
+    def __init__(self, name, track, cell_size=50):
+        self.name = name
+        self.cell_size = cell_size
+
+        # Keep every column sorted by frame so ranges are a pair of binary searches
+        order = np.argsort(track["frame"], kind="stable")
+        self.columns = {key: values[order] for key, values in track.items()}
+        self.frames = self.columns["frame"]
+
+        self.cells = self._build_cells()
+        self._rallies = {}
+
+    def _build_cells(self):
+        """Bucket the rows of detected positions by grid cell"""
+        rows = np.flatnonzero(self.columns["detected"])
+        cx = (self.columns["x"][rows] // self.cell_size).astype(np.int64)
+        cy = (self.columns["y"][rows] // self.cell_size).astype(np.int64)
+
+        order = np.lexsort((cy, cx))
+        rows, cx, cy = rows[order], cx[order], cy[order]
+        boundaries = np.flatnonzero((np.diff(cx) != 0) | (np.diff(cy) != 0)) + 1
+
+        cells = {}
+        for chunk in np.split(np.arange(len(rows)), boundaries):
+            if len(chunk):
+                cells[(int(cx[chunk[0]]), int(cy[chunk[0]]))] = rows[chunk]
+        return cells
+
+    def _row(self, i):
+        row = {}
+        for key, values in self.columns.items():
+            value = values[i]
+            if key == "frame":
+                row[key] = int(value)
+            elif key == "detected":
+                row[key] = bool(value)
+            else:
+                row[key] = None if np.isnan(value) else round(float(value), 2)
+        return row
+
+    def positions(self, start, end):
+        """All rows with start <= frame <= end"""
+        lo = np.searchsorted(self.frames, start, side="left")
+        hi = np.searchsorted(self.frames, end, side="right")
+        return [self._row(i) for i in range(lo, hi)]
+
+    def frames_in_region(self, x0, y0, x1, y1):
+        """Frames where the detected ball lies inside the rectangle (inclusive)"""
+        x0, x1 = min(x0, x1), max(x0, x1)
+        y0, y1 = min(y0, y1), max(y0, y1)
+        size = self.cell_size
+
+        candidates = [
+            rows
+            for (cx, cy), rows in self.cells.items()
+            if x0 // size <= cx <= x1 // size and y0 // size <= cy <= y1 // size
+        ]
+        if not candidates:
+            return []
+
+        rows = np.concatenate(candidates)
+        x, y = self.columns["x"][rows], self.columns["y"][rows]
+        inside = rows[(x >= x0) & (x <= x1) & (y >= y0) & (y <= y1)]
+        return sorted(int(f) for f in self.frames[inside])
+
+    def rallies(self, max_gap=MAX_GAP, min_move=MIN_MOVE):
+        """Split the detections into rallies and count shots in each.
+
+        A rally is a run of detections with no gap longer than max_gap frames.
+        Shots are counted as reversals of the ball's vertical image direction
+        (the ball travelling towards, then away from, the camera) of at least
+        min_move pixels, plus one for the serve. This is a heuristic: jitter is
+        filtered out, but bounces, lob peaks and the serve toss that move the
+        ball more than min_move vertically are still counted as shots.
+        """
+        # Only the default settings are cached, so arbitrary query values can't grow the cache
+        key = (max_gap, min_move)
+        if key in self._rallies:
+            return self._rallies[key]
+
+        rows = np.flatnonzero(self.columns["detected"])
+        rallies = []
+        if len(rows):
+            gaps = np.flatnonzero(np.diff(self.frames[rows]) > max_gap + 1) + 1
+            for segment in np.split(rows, gaps):
+                if len(segment) < 2:
+                    continue
+                reversals = count_reversals(self.columns["y"][segment], min_move)
+                rallies.append({
+                    "video": self.name,
+                    "start_frame": int(self.frames[segment[0]]),
+                    "end_frame": int(self.frames[segment[-1]]),
+                    "shots": reversals + 1,
+                })
+
+        if key == (MAX_GAP, MIN_MOVE):
+            self._rallies[key] = rallies
+        return rallies
+
+
+class TrajectoryIndex:
+    def __init__(self, cell_size=50):
+        self.cell_size = cell_size
+        self.videos = {}
+
+    def add(self, name, track):
+        self.videos[name] = VideoTrack(name, track, self.cell_size)
+
+    def load_dir(self, directory):
+        """Index every .csv results file in a directory, named after the file"""
+        for filename in sorted(os.listdir(directory)):
+            if filename.lower().endswith(".csv"):
+                name = os.path.splitext(filename)[0]
+                self.add(name, load_track(os.path.join(directory, filename)))
+        return len(self.videos)
+
+    def _select(self, video):
+        if video is None:
+            return list(self.videos.values())
+        if video not in self.videos:
+            raise UnknownVideoError(f"unknown video: {video}")
+        return [self.videos[video]]
+
+    def positions(self, video, start, end):
+        return self._select(video)[0].positions(start, end)
+
+    def frames_in_region(self, x0, y0, x1, y1, video=None):
+        return {
+            track.name: track.frames_in_region(x0, y0, x1, y1)
+            for track in self._select(video)
+        }
+
+    def rallies(self, min_shots=1, video=None, max_gap=MAX_GAP, min_move=MIN_MOVE):
+        return [
+            rally
+            for track in self._select(video)
+            for rally in track.rallies(max_gap, min_move)
+            if rally["shots"] >= min_shots
+        ]
+
+
+def make_handler(index):
+    class QueryHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            routes = {
+                "/videos": lambda: sorted(index.videos),
+                "/positions": lambda: index.positions(
+                    params["video"], int(params["start"]), int(params["end"])),
+                "/region": lambda: index.frames_in_region(
+                    *(finite_float(params[name], name) for name in ("x0", "y0", "x1", "y1")),
+                    params.get("video")),
+                "/rallies": lambda: index.rallies(
+                    int(params.get("min_shots", 1)), params.get("video"),
+                    non_negative(int(params.get("max_gap", MAX_GAP)), "max_gap"),
+                    non_negative(finite_float(params.get("min_move", MIN_MOVE), "min_move"), "min_move")),
+            }
+            required = {
+                "/positions": ("video", "start", "end"),
+                "/region": ("x0", "y0", "x1", "y1"),
+            }
+
+            if url.path not in routes:
+                self.send_json(404, {"error": f"unknown endpoint {url.path}"})
+                return
+            missing = [name for name in required.get(url.path, ()) if name not in params]
+            if missing:
+                self.send_json(400, {"error": f"missing parameter(s): {', '.join(missing)}"})
+                return
+            try:
+                self.send_json(200, routes[url.path]())
+            except UnknownVideoError as e:
+                self.send_json(404, {"error": str(e)})
+            except ValueError as e:
+                self.send_json(400, {"error": str(e)})
+
+        def send_json(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return QueryHandler
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-t", "--tracks", required=True, help="directory of per-frame results CSV files")
+    ap.add_argument("--host", default="127.0.0.1", help="address to bind (local only by default)")
+    ap.add_argument("-p", "--port", type=int, default=8765, help="port to listen on")
+    ap.add_argument("--cell-size", type=int, default=50, help="spatial grid cell size in pixels")
+    args = vars(ap.parse_args())
+
+    index = TrajectoryIndex(args["cell_size"])
+    count = index.load_dir(args["tracks"])
+    print(f"Indexed {count} video(s) from {args['tracks']}")
+
+    server = ThreadingHTTPServer((args["host"], args["port"]), make_handler(index))
+    print(f"Trajectory query server listening on http://{args['host']}:{args['port']}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()